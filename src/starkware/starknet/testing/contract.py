@@ -1,11 +1,14 @@
 import dataclasses
-import sys
+import functools
+import inspect
+import keyword
 import types
 from collections import namedtuple
-from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+from typing import Any, Callable, Dict, List, Tuple
 
 from typeguard import check_type
 
+from starkware.cairo.lang.cairo_constants import DEFAULT_PRIME as PRIME
 from starkware.cairo.lang.compiler.ast.cairo_types import (
     CairoType,
     TypeFelt,
@@ -13,26 +16,44 @@ from starkware.cairo.lang.compiler.ast.cairo_types import (
     TypeStruct,
     TypeTuple,
 )
-from starkware.cairo.lang.compiler.parser import parse_type
-from starkware.cairo.lang.compiler.type_system import mark_type_resolved
-from starkware.python.utils import assert_exhausted, safe_zip
+from starkware.python.utils import unique
 from starkware.starknet.business_logic.execution.objects import OrderedEvent
 from starkware.starknet.public.abi import AbiType
 from starkware.starknet.testing.contract_utils import (
     RAW_OUTPUT_ARG_LIST,
     EventManager,
     StructManager,
-    flatten,
     parse_arguments,
 )
 from starkware.starknet.testing.objects import Dataclass, StarknetTransactionExecutionInfo
 from starkware.starknet.testing.state import CastableToAddress, StarknetState
-from starkware.starknet.utils.api_utils import cast_to_felts
+from starkware.starknet.utils.api_utils import cast_to_felt, cast_to_felts
 from starkware.starknet.business_logic.execution.objects import TransactionExecutionInfo
 
 # Represents Python types, in particular those that are parallel to the cairo ones:
 # int, tuple and list (matching the cairo types TypeFelt, TypeTuple/TypeStruct and TypePointer).
 PythonType = Any
+# A predicate checking whether a value matches some Pythonic type annotation.
+Validator = Callable[[Any], bool]
+# A function appending the flat list of felts representing a value (of some Cairo type) to the
+# given list.
+Writer = Callable[[Any, List[int]], None]
+
+# Opcodes of an argument plan - a flat list of (opcode, operand) instructions, describing how to
+# rebuild the Pythonic variant of a list of Cairo arguments from their flat list of values:
+# * PLAN_FELT consumes a single value.
+# * PLAN_BEGIN opens a tuple or a struct, whose members are the values built until the matching
+#   PLAN_TUPLE_END or PLAN_STRUCT_END (whose operand is the contract struct type).
+# * PLAN_ARRAY consumes the array length, and then runs its operand (the plan of a single
+#   element) once per element, without recursion (see run_plan()).
+PLAN_FELT = 0
+PLAN_BEGIN = 1
+PLAN_TUPLE_END = 2
+PLAN_STRUCT_END = 3
+PLAN_ARRAY = 4
+ArgumentPlan = List[Tuple[int, Any]]
+# The plan of a single felt.
+FELT_PLAN: ArgumentPlan = [(PLAN_FELT, None)]
 
 
 class StarknetContract:
@@ -59,32 +80,51 @@ class StarknetContract:
         self.abi = abi
         self.deploy_execution_info = deploy_execution_info
 
-        self.struct_manager = StructManager(abi=abi)
-        self.event_manager = EventManager(abi=abi)
+        # Contracts whose ABIs have the same structs (events), e.g., a proxy contract after
+        # replace_abi() and its implementation, share the same struct (event) manager.
+        self.struct_manager = StructManager.from_cache(abi=abi)
+        self.event_manager = EventManager.from_cache(abi=abi)
 
         self._abi_function_mapping = {
             abi_entry["name"]: abi_entry for abi_entry in abi if abi_entry["type"] == "function"
         }
 
+        # The names of the ABI functions and structs, checked by __getattr__.
+        self._abi_function_names = frozenset(self._abi_function_mapping)
+        self._struct_names = frozenset(self.struct_manager)
+
         # Cached contract functions.
         self._contract_functions: Dict[str, Callable] = {}
 
+        # Cached argument plans of the contract events, by event selector.
+        self._event_plans: Dict[int, ArgumentPlan] = {}
+
+        # Cached Pythonic type annotations, keyed by the formatted Cairo type and whether the
+        # type is nested in another type.
+        self._annotations: Dict[Tuple[str, bool], PythonType] = {}
+
         if isinstance(contract_address, str):
             contract_address = int(contract_address, 16)
         assert isinstance(contract_address, int)
         self.contract_address = contract_address
 
     def __dir__(self):
-        return list(object.__dir__(self)) + list(self._abi_function_mapping.keys())
+        # Functions that were already accessed are installed on the instance (see __getattr__).
+        return unique(list(object.__dir__(self)) + list(self._abi_function_mapping.keys()))
 
     def __getattr__(self, name: str):
-        if name in self._abi_function_mapping:
-            return self.get_contract_function(name=name)
-        elif name in self.struct_manager:
-            return self.struct_manager.get_contract_struct(name=name)
+        if name in self._abi_function_names:
+            value = self.get_contract_function(name=name)
+        elif name in self._struct_names:
+            value = self.struct_manager.get_contract_struct(name=name)
         else:
             raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
 
+        # Install the attribute on the instance, so that subsequent lookups are resolved by the
+        # regular attribute lookup, without reaching __getattr__.
+        setattr(self, name, value)
+        return value
+
     def get_contract_function(self, name: str) -> Callable:
         """
         Returns a function object that acts as a proxy for a StarkNet contract function.
@@ -107,6 +147,8 @@ class StarknetContract:
         retdata_arg_names, retdata_arg_types = parse_arguments(
             arguments_abi=function_abi["outputs"]
         )
+        assert len(arg_names) == len(arg_types)
+        calldata_arg_types: List[Tuple[str, CairoType]] = list(zip(arg_names, arg_types))
 
         # Build Pythonic type annotations to those arguments, matching their Cairo types.
         # I.e., Cairo Array <> Python List; Cairo tuple/struct <> Python Tuple;
@@ -114,57 +156,155 @@ class StarknetContract:
         # This will be added to the contract function info, and be used to validate the structure
         # of the user's input.
         calldata_annotations: Dict[str, PythonType] = {
-            name: self._get_annotation(arg_type=arg_type)
-            for name, arg_type in safe_zip(arg_names, arg_types)
+            name: self._get_annotation(arg_type=arg_type) for name, arg_type in calldata_arg_types
         }
         retdata_annotations: List[PythonType] = [
             self._get_annotation(arg_type=arg_type) for arg_type in retdata_arg_types
         ]
+        retdata_tuple: type = namedtuple(f"{name}_return_type", retdata_arg_names)  # type: ignore
 
-        def template():
-            all_locals = locals()
-            args = {arg_name: all_locals[arg_name] for arg_name in arg_names}
-            return self._build_function_call(
-                function_abi=function_abi,
-                calldata_annotations=calldata_annotations,
-                args=args,
-                retdata_arg_names=retdata_arg_names,
+        func_globals: Dict[str, Any] = {
+            "__name__": __name__,
+            "_build_function_call": functools.partial(
+                self._build_function_call,
+                function_name=name,
                 retdata_arg_types=retdata_arg_types,
-            )
-
-        # Create a function like template(), but with extra arguments.
-        if sys.version_info.major != 3:
-            raise Exception("Must be using Python3.")
-        posonlyargcount = (0,) if sys.version_info.minor >= 8 else ()
-        func_code = types.CodeType(  # type: ignore
-            len(arg_names),  # Arg: argcount.
-            *posonlyargcount,  # type: ignore
-            0,  # Arg: kwonlyargcount.
-            len(arg_names),  # Arg: nlocals.
-            template.__code__.co_stacksize + len(arg_names),  # Arg: stacksize.
-            template.__code__.co_flags,  # Arg: flags.
-            template.__code__.co_code,  # Arg: codestring.
-            template.__code__.co_consts,  # Arg: constants.
-            template.__code__.co_names,  # Arg: names.
-            tuple(arg_names),  # Arg: varnames.
-            template.__code__.co_filename,  # Arg: filename.
-            name,  # Arg: name.
-            template.__code__.co_firstlineno,  # Arg: firstlineno.
-            template.__code__.co_lnotab,  # Arg: lnotab.
-            template.__code__.co_freevars,  # Arg: freevars.
-            template.__code__.co_cellvars,  # Arg: cellvars.
+                retdata_tuple=retdata_tuple,
+                has_raw_output=(retdata_arg_names == RAW_OUTPUT_ARG_LIST),
+            ),
+        }
+        func_name, func_code = self._generate_function_code(
+            name=name,
+            calldata_arg_types=calldata_arg_types,
+            calldata_annotations=calldata_annotations,
+            func_globals=func_globals,
         )
-
-        closure = template.__closure__  # type: ignore
-        func = types.FunctionType(code=func_code, globals=globals(), closure=closure)
+        exec(compile(func_code, f"<{name}>", "exec"), func_globals)
+        func = func_globals[func_name]
+        func.__name__ = func.__qualname__ = name
         func.__annotations__ = {**calldata_annotations, "return": tuple(retdata_annotations)}
+        # Expose the argument names also when the function takes *args and **kwargs (see
+        # _generate_function_code()).
+        func.__signature__ = build_signature(  # type: ignore
+            arg_names=arg_names,
+            annotations=calldata_annotations,
+            return_annotation=tuple(retdata_annotations),
+        )
 
         return func
 
+    def _generate_function_code(
+        self,
+        name: str,
+        calldata_arg_types: List[Tuple[str, CairoType]],
+        calldata_annotations: Dict[str, PythonType],
+        func_globals: Dict[str, Any],
+    ) -> Tuple[str, str]:
+        """
+        Generates the Python code of a function, which takes the calldata arguments, validates
+        them, flattens them to calldata, and returns the result of
+        _build_function_call(calldata=...).
+        The code is specialized to the Cairo types of the arguments; felts and felt arrays are
+        handled inline, other types by validators and writers built for them.
+        Adds the objects referred to by the code to func_globals. These, as well as the builtins
+        and the local variables the code uses, have names starting with an underscore.
+        Cairo names that cannot be used in the code (Python keywords, or names that clash with
+        the above) are not used: the function is then defined under another name, or takes
+        *args and **kwargs and binds them to the argument names using bind_arguments().
+
+        Returns the name under which the function is defined, and the code.
+        """
+        func_globals.update(
+            _PRIME=PRIME,
+            _cast_to_felt=cast_to_felt,
+            _cast_to_felts=cast_to_felts,
+            _check_type=check_type,
+            _int=int,
+            _isinstance=isinstance,
+            _len=len,
+            _type=type,
+        )
+        arg_names = [arg_name for arg_name, _ in calldata_arg_types]
+        validation_lines: List[str] = []
+        calldata_lines: List[str] = ["_calldata = []"]
+        for i, (arg_name, arg_type) in enumerate(calldata_arg_types):
+            func_globals[f"_annotation_{i}"] = calldata_annotations[arg_name]
+            if not isinstance(arg_type, TypeFelt):
+                func_globals[f"_validate_{i}"] = self._build_validator(arg_type=arg_type)
+                if not (
+                    isinstance(arg_type, TypePointer) and isinstance(arg_type.pointee, TypeFelt)
+                ):
+                    func_globals[f"_write_{i}"] = self._build_writer(arg_type=arg_type)
+
+        reserved_names = {*func_globals, "_calldata", "__debug__"}
+
+        def can_be_used(identifier: str) -> bool:
+            return (
+                identifier.isidentifier()
+                and not keyword.iskeyword(identifier)
+                and identifier not in reserved_names
+            )
+
+        func_name = name if can_be_used(name) else "_function"
+        if all(can_be_used(arg_name) for arg_name in arg_names):
+            arg_exprs = arg_names
+            header_line = f"def {func_name}({', '.join(arg_names)}):"
+            body_lines: List[str] = []
+        else:
+            # Refer to the arguments through local variables of the form _arg_{i}.
+            arg_exprs = [f"_arg_{i}" for i in range(len(arg_names))]
+            func_globals["_bind_arguments"] = functools.partial(
+                bind_arguments, function_name=name, arg_names=arg_names
+            )
+            header_line = f"def {func_name}(*_args, **_kwargs):"
+            body_lines = [f"{', '.join(arg_exprs)}, = _bind_arguments(args=_args, kwargs=_kwargs)"]
+
+        for i, ((arg_name, arg_type), arg) in enumerate(zip(calldata_arg_types, arg_exprs)):
+            if isinstance(arg_type, TypeFelt):
+                is_valid = f"_isinstance({arg}, _int)"
+                # Values are almost always felts already, in which case they are appended as is.
+                calldata_lines.append(
+                    f"_calldata.append({arg} if _type({arg}) is _int and "
+                    f"0 <= {arg} < _PRIME else _cast_to_felt({arg}))"
+                )
+            else:
+                is_valid = f"_validate_{i}({arg})"
+                if f"_write_{i}" in func_globals:
+                    calldata_lines.append(f"_write_{i}({arg}, _calldata)")
+                else:
+                    calldata_lines.append(f"_calldata.append(_len({arg}))")
+                    calldata_lines.append(f"_calldata.extend(_cast_to_felts(values={arg}))")
+
+            validation_lines.extend(
+                [
+                    f"if not {is_valid}:",
+                    # Let typeguard describe the mismatch.
+                    f"    _check_type(argname={f'argument {arg_name}'!r}, value={arg}, "
+                    f"expected_type=_annotation_{i})",
+                ]
+            )
+
+        if len(validation_lines) > 0:
+            # Check the full structure of the values, unless running with python -O.
+            body_lines += ["if __debug__:", *(f"    {line}" for line in validation_lines)]
+        body_lines += [*calldata_lines, "return _build_function_call(calldata=_calldata)"]
+        return func_name, header_line + "\n" + "".join(f"    {line}\n" for line in body_lines)
+
     def _get_annotation(self, arg_type: CairoType, is_nested: bool = False) -> PythonType:
         """
         Returns the Pythonic type annotation of the given Cairo type.
         """
+        key = (arg_type.format(), is_nested)
+        if key not in self._annotations:
+            # Cache annotation.
+            self._annotations[key] = self._build_annotation(arg_type=arg_type, is_nested=is_nested)
+
+        return self._annotations[key]
+
+    def _build_annotation(self, arg_type: CairoType, is_nested: bool) -> PythonType:
+        """
+        Builds the Pythonic type annotation of the given Cairo type.
+        """
         if isinstance(arg_type, TypeFelt):
             return int
         if isinstance(arg_type, TypePointer):
@@ -179,59 +319,100 @@ class StarknetContract:
                 )
             ]
         if isinstance(arg_type, TypeStruct):
-            struct_def = self.struct_manager.get_struct_definition(name=arg_type.scope.path[-1])
+            member_types = self.struct_manager.get_member_types(name=arg_type.scope.path[-1])
             return Tuple[
                 tuple(
-                    self._get_annotation(arg_type=member.cairo_type, is_nested=True)
-                    for member in struct_def.members.values()
+                    self._get_annotation(arg_type=member_type, is_nested=True)
+                    for member_type in member_types
                 )
             ]
 
         raise NotImplementedError
 
-    def _build_function_call(
-        self,
-        function_abi: dict,
-        calldata_annotations: Dict[str, PythonType],
-        args: dict,
-        retdata_arg_names: List[str],
-        retdata_arg_types: List[CairoType],
-    ):
+    def _build_validator(self, arg_type: CairoType) -> Validator:
         """
-        Builds a StarknetContractFunctionInvocation object, representing a call to a StarkNet
-        contract with a particular state and set of inputs.
+        Builds a predicate that checks whether a value matches the Pythonic type annotation of the
+        given Cairo type (see _get_annotation()).
         """
-        # Prepare calldata.
-        calldata: List[int] = []
-        for input_entry in function_abi["inputs"]:
-            name = input_entry["name"]
-            arg_cairo_type = mark_type_resolved(parse_type(code=input_entry["type"]))
-            if name not in args:
-                continue
+        if isinstance(arg_type, TypeFelt):
+            return lambda value: isinstance(value, int)
+        if isinstance(arg_type, TypePointer):
+            validate_element = self._build_validator(arg_type=arg_type.pointee)
+            return lambda value: isinstance(value, list) and all(map(validate_element, value))
+        if isinstance(arg_type, TypeTuple):
+            member_types = arg_type.types
+        elif isinstance(arg_type, TypeStruct):
+            member_types = self.struct_manager.get_member_types(name=arg_type.scope.path[-1])
+        else:
+            raise NotImplementedError
+
+        member_validators = [
+            self._build_validator(arg_type=member_type) for member_type in member_types
+        ]
+        n_members = len(member_validators)
+        return (
+            lambda value: isinstance(value, tuple)
+            and len(value) == n_members
+            and all(validate(member) for validate, member in zip(member_validators, value))
+        )
 
-            value = args[name]
-            # Checks the full structure of the value.
-            check_type(
-                argname=f"argument {name}", value=value, expected_type=calldata_annotations[name]
+    def _build_writer(self, arg_type: CairoType) -> Writer:
+        """
+        Builds a function that appends the flat list of felts representing a value of the given
+        Cairo type to a list. Arrays are prefixed by their length.
+        """
+        if isinstance(arg_type, TypeFelt):
+            # Values are almost always felts already, in which case they are appended as is.
+            return lambda value, out: out.append(
+                value if type(value) is int and 0 <= value < PRIME else cast_to_felt(value)
             )
-            value = flatten(name=name, value=value)
-            if isinstance(arg_cairo_type, TypePointer):
-                calldata.append(len(args[name]))
+        if isinstance(arg_type, TypePointer):
+            write_element = self._build_writer(arg_type=arg_type.pointee)
+
+            def write_array(value: List[Any], out: List[int]):
+                out.append(len(value))
+                for element in value:
+                    write_element(element, out)
+
+            return write_array
+        if isinstance(arg_type, TypeTuple):
+            member_types = arg_type.types
+        elif isinstance(arg_type, TypeStruct):
+            member_types = self.struct_manager.get_member_types(name=arg_type.scope.path[-1])
+        else:
+            raise NotImplementedError
 
-            calldata.extend(value)
+        member_writers = [self._build_writer(arg_type=member_type) for member_type in member_types]
 
-        function_name = function_abi["name"]
+        def write_members(value: tuple, out: List[int]):
+            for write_member, member in zip(member_writers, value):
+                write_member(member, out)
 
+        return write_members
+
+    def _build_function_call(
+        self,
+        function_name: str,
+        calldata: List[int],
+        retdata_arg_types: List[CairoType],
+        retdata_tuple: type,
+        has_raw_output: bool,
+    ) -> "StarknetContractFunctionInvocation":
+        """
+        Builds a StarknetContractFunctionInvocation object, representing a call to a StarkNet
+        contract with a particular state and set of inputs.
+        """
         return StarknetContractFunctionInvocation(
             state=self.state,
             struct_manager=self.struct_manager,
             event_manager=self.event_manager,
+            event_plans=self._event_plans,
             contract_address=self.contract_address,
             name=function_name,
-            calldata=cast_to_felts(values=calldata),
+            calldata=calldata,
             retdata_arg_types=retdata_arg_types,
-            retdata_tuple=namedtuple(f"{function_name}_return_type", retdata_arg_names),
-            has_raw_output=(retdata_arg_names == RAW_OUTPUT_ARG_LIST),
+            retdata_tuple=retdata_tuple,
+            has_raw_output=has_raw_output,
         )
 
     def replace_abi(
@@ -243,13 +424,51 @@ class StarknetContract:
         Typically used to replace the ABI of a proxy contract with the ABI of the
         implementation contract.
         """
-        return StarknetContract(
+        contract = StarknetContract(
             state=self.state,
             abi=impl_contract_abi,
             contract_address=self.contract_address,
             deploy_execution_info=self.deploy_execution_info,
         )
 
+        # The cached contract functions depend on the structs (through the argument types) and on
+        # the events (through the invocations they build). If both are unchanged, reuse the
+        # functions whose ABI entry is unchanged, bound to the new contract.
+        if (
+            contract.struct_manager is self.struct_manager
+            and contract.event_manager is self.event_manager
+        ):
+            for name, func in self._contract_functions.items():
+                if self._abi_function_mapping[name] == contract._abi_function_mapping.get(name):
+                    contract._contract_functions[name] = contract._rebind_contract_function(
+                        func=func
+                    )
+
+        return contract
+
+    def _rebind_contract_function(self, func: Callable) -> Callable:
+        """
+        Given a contract function built by another contract (see _build_contract_function()),
+        returns a copy of it that builds its invocations using this contract.
+        """
+        build_function_call = func.__globals__["_build_function_call"]  # type: ignore
+        func_globals = {
+            **func.__globals__,  # type: ignore
+            "_build_function_call": functools.partial(
+                self._build_function_call, **build_function_call.keywords
+            ),
+        }
+        rebound_func = types.FunctionType(
+            code=func.__code__,  # type: ignore
+            globals=func_globals,
+            name=func.__name__,
+        )
+        rebound_func.__qualname__ = func.__qualname__
+        rebound_func.__annotations__ = func.__annotations__
+        rebound_func.__signature__ = func.__signature__  # type: ignore
+
+        return rebound_func
+
 
 class ArgumentParsingFailed(Exception):
     pass
@@ -261,9 +480,26 @@ class StarknetContractFunctionInvocation:
     Represents a call to a StarkNet contract with a particular state and set of inputs.
     """
 
+    # An instance is created per call; avoid allocating an instance dict for each. Must list all
+    # the fields below (dataclass(slots=True) requires Python 3.10).
+    __slots__ = (
+        "state",
+        "struct_manager",
+        "event_manager",
+        "event_plans",
+        "contract_address",
+        "name",
+        "calldata",
+        "retdata_arg_types",
+        "retdata_tuple",
+        "has_raw_output",
+    )
+
     state: StarknetState
     struct_manager: StructManager
     event_manager: EventManager
+    # Cached argument plans of the contract events, shared by all invocations of the contract.
+    event_plans: Dict[int, ArgumentPlan]
     contract_address: CastableToAddress
     name: str
     calldata: List[int]
@@ -315,9 +551,14 @@ class StarknetContractFunctionInvocation:
         Given a list of low-level events, builds contract events (i.e., a dynamic dataclass) from
         those corresponding to high-level ones.
         """
+        event_manager = self.event_manager
+        if len(event_manager) == 0:
+            # The contract has no high-level events.
+            return []
+
         events: List[Dataclass] = []
         for raw_event in raw_events:
-            if len(raw_event.keys) == 0 or raw_event.keys[0] not in self.event_manager:
+            if len(raw_event.keys) == 0 or raw_event.keys[0] not in event_manager:
                 # It is a low-level event emitted using directly the emit_event syscall.
                 continue
 
@@ -329,73 +570,198 @@ class StarknetContractFunctionInvocation:
             # level event - i.e., without the exact amount of data).
             try:
                 args = self._build_arguments(
-                    arg_values=arg_values,
-                    arg_types=self.event_manager.get_event_argument_types(identifier=selector),
+                    arg_values=arg_values, plan=self._get_event_plan(selector=selector)
                 )
-                args_dataclass = self.event_manager.get_contract_event(identifier=selector)
+                args_dataclass = event_manager.get_contract_event(identifier=selector)
                 events.append(args_dataclass(*args))
             except ArgumentParsingFailed:
                 pass
 
         return events
 
-    def _build_arguments(self, arg_values: List[int], arg_types: List[CairoType]) -> List[Any]:
+    def _get_event_plan(self, selector: int) -> ArgumentPlan:
         """
-        Reconstructs a Pythonic variant of the original Cairo structure of the arguments, deduced by
-        their Cairo types, and fills it with the given (flat list of) values.
+        Returns the argument plan of the event whose selector is given.
         """
+        if selector not in self.event_plans:
+            # Cache plan.
+            self.event_plans[selector] = self._compile_plan(
+                arg_types=self.event_manager.get_event_argument_types(identifier=selector)
+            )
 
-        def build_arg(
-            arg_type: CairoType, arg_value_iterator: Iterator[int]
-        ) -> Union[int, tuple, List[Any]]:
-            """
-            Reconstructs a Pythonic variant of the original Cairo structure of the given argument.
-            """
+        return self.event_plans[selector]
+
+    def _compile_plan(self, arg_types: List[CairoType]) -> ArgumentPlan:
+        """
+        Compiles the given Cairo types to an argument plan (see PLAN_FELT), so that rebuilding
+        arguments of those types does not need to dispatch on the types themselves.
+        """
+        plan: ArgumentPlan = []
+        for arg_type in arg_types:
             if isinstance(arg_type, TypeFelt):
-                return next(arg_value_iterator)
-            if isinstance(arg_type, TypeTuple):
-                return tuple(
-                    build_arg(arg_type=cairo_type, arg_value_iterator=arg_value_iterator)
-                    for cairo_type in arg_type.types
-                )
-            if isinstance(arg_type, TypeStruct):
+                plan.append((PLAN_FELT, None))
+            elif isinstance(arg_type, TypeTuple):
+                plan.append((PLAN_BEGIN, None))
+                plan.extend(self._compile_plan(arg_types=arg_type.types))
+                plan.append((PLAN_TUPLE_END, None))
+            elif isinstance(arg_type, TypeStruct):
                 struct_name = arg_type.scope.path[-1]
-                struct_def = self.struct_manager.get_struct_definition(name=struct_name)
-                contract_struct = self.struct_manager.get_contract_struct(name=struct_name)
-                return contract_struct(
-                    *(
-                        build_arg(arg_type=member.cairo_type, arg_value_iterator=arg_value_iterator)
-                        for member in struct_def.members.values()
-                    )
+                member_types = self.struct_manager.get_member_types(name=struct_name)
+                plan.append((PLAN_BEGIN, None))
+                plan.extend(self._compile_plan(arg_types=member_types))
+                plan.append(
+                    (PLAN_STRUCT_END, self.struct_manager.get_contract_struct(name=struct_name))
                 )
-            if isinstance(arg_type, TypePointer):
-                arr_len = next(arg_value_iterator)
-                return [
-                    build_arg(arg_type=arg_type.pointee, arg_value_iterator=arg_value_iterator)
-                    for _ in range(arr_len)
-                ]
-
-            raise NotImplementedError
+            elif isinstance(arg_type, TypePointer):
+                plan.append((PLAN_ARRAY, self._compile_plan(arg_types=[arg_type.pointee])))
+            else:
+                raise NotImplementedError
 
-        arg_value_iterator = iter(arg_values)
+        return plan
 
+    def _build_arguments(self, arg_values: List[int], plan: ArgumentPlan) -> List[Any]:
+        """
+        Reconstructs a Pythonic variant of the original Cairo structure of the arguments, deduced by
+        their argument plan, and fills it with the given (flat list of) values.
+        """
         try:
-            res = [
-                build_arg(arg_type=arg_type, arg_value_iterator=arg_value_iterator)
-                for arg_type in arg_types
-            ]
-        except StopIteration:
+            res, index = run_plan(plan=plan, arg_values=arg_values, index=0)
+        except IndexError:
             raise ArgumentParsingFailed("Too few argument values.")
 
-        # Make sure the iterator is empty.
-        try:
-            assert_exhausted(iterator=arg_value_iterator)
-        except AssertionError:
+        if index != len(arg_values):
             raise ArgumentParsingFailed("Too many argument values.")
 
         return res
 
 
+def run_plan(plan: ArgumentPlan, arg_values: List[int], index: int) -> Tuple[List[Any], int]:
+    """
+    Runs the given argument plan on arg_values, starting at the given index.
+    Returns the built values and the index of the first value that was not consumed.
+    Raises IndexError if there are not enough values.
+    """
+    values: List[Any] = []
+    # The values of the enclosing tuples, structs and arrays.
+    stack: List[List[Any]] = []
+    # The plans of the enclosing arrays, with the position in each of them to continue from and
+    # the number of elements they still have to build (not counting the current one).
+    frames: List[Tuple[ArgumentPlan, int, int]] = []
+    pc = 0
+    n_remaining = 0
+    while True:
+        if pc == len(plan):
+            if len(frames) == 0:
+                break
+            if n_remaining > 0:
+                # Build the next element of the array.
+                n_remaining -= 1
+                pc = 0
+                continue
+
+            # All the elements of the array were built.
+            elements = values
+            values = stack.pop()
+            values.append(elements)
+            plan, pc, n_remaining = frames.pop()
+            continue
+
+        opcode, operand = plan[pc]
+        pc += 1
+        if opcode == PLAN_FELT:
+            values.append(arg_values[index])
+            index += 1
+        elif opcode == PLAN_BEGIN:
+            stack.append(values)
+            values = []
+        elif opcode == PLAN_TUPLE_END:
+            members = values
+            values = stack.pop()
+            values.append(tuple(members))
+        elif opcode == PLAN_STRUCT_END:
+            members = values
+            values = stack.pop()
+            values.append(operand(*members))
+        else:
+            assert opcode == PLAN_ARRAY, f"Unexpected plan opcode: {opcode}."
+            arr_len = arg_values[index]
+            index += 1
+            if operand == FELT_PLAN:
+                # An array of felts is a slice of the values.
+                if index + arr_len > len(arg_values):
+                    raise IndexError("Array is longer than the remaining values.")
+                values.append(arg_values[index : index + arr_len])
+                index += arr_len
+            elif arr_len == 0:
+                values.append([])
+            else:
+                # The length comes from unvalidated values; reject lengths that cannot be
+                # satisfied before building any element (elements of a non-empty type consume at
+                # least one value each).
+                if arr_len > len(arg_values) - index and any(
+                    element_opcode in (PLAN_FELT, PLAN_ARRAY) for element_opcode, _ in operand
+                ):
+                    raise IndexError("Array is longer than the remaining values.")
+                # Run the element plan arr_len times, collecting the elements in a new list. The
+                # list is not preallocated, since the element plan appends each element to it.
+                frames.append((plan, pc, n_remaining))
+                stack.append(values)
+                values = []
+                plan, pc, n_remaining = operand, 0, arr_len - 1
+
+    return values, index
+
+
+def bind_arguments(
+    function_name: str, arg_names: List[str], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+) -> List[Any]:
+    """
+    Binds the given positional and keyword arguments to the given argument names, the way Python
+    binds them for a function taking those arguments, and returns the values of the arguments.
+    """
+    if len(args) > len(arg_names):
+        raise TypeError(
+            f"{function_name}() takes {len(arg_names)} positional arguments but {len(args)} "
+            "were given"
+        )
+
+    values = dict(zip(arg_names, args))
+    for arg_name, value in kwargs.items():
+        if arg_name not in arg_names:
+            raise TypeError(f"{function_name}() got an unexpected keyword argument '{arg_name}'")
+        if arg_name in values:
+            raise TypeError(f"{function_name}() got multiple values for argument '{arg_name}'")
+        values[arg_name] = value
+
+    missing_arg_names = [arg_name for arg_name in arg_names if arg_name not in values]
+    if len(missing_arg_names) > 0:
+        raise TypeError(f"{function_name}() missing required arguments: {missing_arg_names}")
+
+    return [values[arg_name] for arg_name in arg_names]
+
+
+def build_signature(
+    arg_names: List[str], annotations: Dict[str, PythonType], return_annotation: PythonType
+) -> inspect.Signature:
+    """
+    Builds the signature of a function taking the given arguments (positional or keyword).
+    The argument names may be Python keywords (which are valid Cairo names).
+    """
+    parameters = []
+    for arg_name in arg_names:
+        # inspect.Parameter rejects Python keywords; create the parameter with a placeholder name
+        # and set the actual one.
+        parameter = inspect.Parameter(
+            name="_",
+            kind=inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            annotation=annotations[arg_name],
+        )
+        parameter._name = arg_name  # type: ignore
+        parameters.append(parameter)
+
+    return inspect.Signature(parameters=parameters, return_annotation=return_annotation)
+
+
 @dataclasses.dataclass(frozen=True)
 class DeclaredClass:
     """
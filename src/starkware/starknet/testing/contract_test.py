@@ -1,10 +1,12 @@
+import inspect
 import os
 import re
-from typing import Tuple
+from typing import List, Tuple
 
 import pytest
 
-from starkware.starknet.business_logic.execution.objects import Event
+from starkware.cairo.lang.cairo_constants import DEFAULT_PRIME as PRIME
+from starkware.starknet.business_logic.execution.objects import Event, OrderedEvent
 from starkware.starknet.core.test_contract.test_utils import get_contract_class
 from starkware.starknet.public.abi import AbiType, get_selector_from_name
 from starkware.starknet.testing.contract import DeclaredClass, StarknetContract
@@ -128,6 +130,72 @@ async def test_proxy_call(proxy_contract: StarknetContract, test_class: Declared
     assert execution_info.result == (7,)
 
 
+@pytest.mark.asyncio
+async def test_replace_abi(test_contract: StarknetContract):
+    sum_points = test_contract.sum_points
+    replaced_contract = test_contract.replace_abi(impl_contract_abi=test_contract.abi)
+
+    # Contracts with the same structs and events share their struct and event managers.
+    assert replaced_contract.struct_manager is test_contract.struct_manager
+    assert replaced_contract.event_manager is test_contract.event_manager
+    assert replaced_contract.Point is test_contract.Point
+
+    # Functions that were already built are reused, bound to the new contract.
+    replaced_sum_points = replaced_contract.sum_points
+    assert replaced_sum_points is not sum_points
+    assert replaced_sum_points.__code__ is sum_points.__code__
+    assert replaced_sum_points.__annotations__ == sum_points.__annotations__
+    build_function_call = replaced_sum_points.__globals__["_build_function_call"]
+    assert build_function_call.func.__self__ is replaced_contract
+
+    execution_info = await replaced_contract.sum_points(points=((1, 2), (3, 4))).invoke()
+    assert execution_info.result == (test_contract.Point(x=4, y=6),)
+
+
+@pytest.mark.asyncio
+async def test_argument_names(starknet: Starknet):
+    # Argument names which are Python keywords or clash with the names used by the generated
+    # function code.
+    abi = [
+        {
+            "type": "function",
+            "name": "f",
+            "inputs": [
+                {"name": "in", "type": "felt"},
+                {"name": "_type", "type": "felt"},
+                {"name": "_calldata_len", "type": "felt"},
+                {"name": "_calldata", "type": "felt*"},
+            ],
+            "outputs": [],
+        },
+    ]
+    contract = StarknetContract(
+        state=starknet.state, abi=abi, contract_address=1, deploy_execution_info=None
+    )
+
+    # The signature has the actual argument names.
+    signature = inspect.signature(contract.f)
+    assert {name: param.annotation for name, param in signature.parameters.items()} == {
+        "in": int,
+        "_type": int,
+        "_calldata": List[int],
+    }
+    assert signature.return_annotation == ()
+
+    assert contract.f(1, -1, [2, 3]).calldata == [1, PRIME - 1, 2, 2, 3]
+    assert contract.f(**{"in": 1, "_type": 2, "_calldata": [3]}).calldata == [1, 2, 1, 3]
+    assert contract.f(1, _type=2, _calldata=[]).calldata == [1, 2, 0]
+
+    with pytest.raises(TypeError, match=re.escape("f() got an unexpected keyword argument 'x'")):
+        contract.f(1, 2, [], x=3)
+    with pytest.raises(TypeError, match=re.escape("f() got multiple values for argument 'in'")):
+        contract.f(1, 2, [], **{"in": 3})
+    with pytest.raises(TypeError, match=re.escape("f() missing required arguments: ['_calldata']")):
+        contract.f(1, 2)
+    with pytest.raises(TypeError, match=re.escape("type of argument in must be int")):
+        contract.f("1", 2, [])
+
+
 @pytest.mark.asyncio
 async def test_raw_decorators(
     test_contract: StarknetContract,
@@ -180,6 +248,32 @@ async def test_event(test_contract: StarknetContract):
     assert test_contract.state.events == [actual_raw_event]
 
 
+@pytest.mark.asyncio
+async def test_event_parsing(test_contract: StarknetContract):
+    selector = get_selector_from_name("log_sum_points")
+    raw_events = [
+        # Too few values (the second point of the array is cut in the middle).
+        OrderedEvent(order=0, keys=[selector], data=[2, 1, 2, 3]),
+        # An array length much larger than the number of values.
+        OrderedEvent(order=1, keys=[selector], data=[2**200, 1, 2, 3, 4]),
+        # Too many values.
+        OrderedEvent(order=2, keys=[selector], data=[0, 1, 2, 3]),
+        # A low-level event.
+        OrderedEvent(order=3, keys=[], data=[1]),
+        OrderedEvent(order=4, keys=[selector], data=[1, 5, 6, 7, 8]),
+    ]
+
+    log_sum_points_tuple = test_contract.event_manager.get_contract_event(
+        identifier="log_sum_points"
+    )
+    invocation = test_contract.sum_points(points=((1, 2), (3, 4)))
+    assert invocation._build_events(raw_events=raw_events) == [
+        log_sum_points_tuple(
+            points=[test_contract.Point(x=5, y=6)], sum=test_contract.Point(x=7, y=8)
+        )
+    ]
+
+
 # Utilities.
 
 
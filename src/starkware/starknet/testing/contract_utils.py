@@ -1,6 +1,8 @@
+import functools
+import json
 from collections import namedtuple
 from dataclasses import make_dataclass
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 from starkware.cairo.lang.compiler.ast.cairo_types import CairoType, TypeFelt, TypePointer
 from starkware.cairo.lang.compiler.identifier_definition import StructDefinition
@@ -24,15 +26,39 @@ class StructManager:
             if abi_entry["type"] == "struct"
         }
 
-        # Cached contract structs.
+        # Cached contract structs and member types.
         self._contract_structs: Dict[str, type] = {}
+        self._member_types: Dict[str, List[CairoType]] = {}
+
+    @classmethod
+    def from_cache(cls, abi: AbiType) -> "StructManager":
+        """
+        Returns a StructManager of the given ABI. The instance (and its caches) is shared with
+        other ABIs that have the same struct entries.
+        """
+        entries_key = get_abi_entries_key(abi=abi, entry_type="struct")
+        return _get_cached_struct_manager(entries_key=entries_key)
 
     def __contains__(self, key: str) -> bool:
         return key in self._struct_definition_mapping
 
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._struct_definition_mapping)
+
     def get_struct_definition(self, name: str) -> StructDefinition:
         return self._struct_definition_mapping[name]
 
+    def get_member_types(self, name: str) -> List[CairoType]:
+        """
+        Returns the Cairo types of the members of the struct whose name is given.
+        """
+        if name not in self._member_types:
+            # Cache member types.
+            struct_def = self._struct_definition_mapping[name]
+            self._member_types[name] = [member.cairo_type for member in struct_def.members.values()]
+
+        return self._member_types[name]
+
     def get_contract_struct(self, name: str) -> type:
         """
         Returns a named tuple representing the Cairo struct whose name is given.
@@ -66,12 +92,24 @@ class EventManager:
         self._contract_events: Dict[str, Dataclass] = {}
         self._event_name_to_argument_types: Dict[str, List[CairoType]] = {}
 
+    @classmethod
+    def from_cache(cls, abi: AbiType) -> "EventManager":
+        """
+        Returns an EventManager of the given ABI. The instance (and its caches) is shared with
+        other ABIs that have the same event entries.
+        """
+        entries_key = get_abi_entries_key(abi=abi, entry_type="event")
+        return _get_cached_event_manager(entries_key=entries_key)
+
     def __contains__(self, identifier: EventIdentifier) -> bool:
         if isinstance(identifier, str):
             return identifier in self._abi_event_mapping
 
         return identifier in self._selector_to_name
 
+    def __len__(self) -> int:
+        return len(self._abi_event_mapping)
+
     def get_contract_event(self, identifier: EventIdentifier) -> Dataclass:
         """
         Returns a named tuple representing the event whose name is given.
@@ -108,6 +146,25 @@ class EventManager:
         return identifier if isinstance(identifier, str) else self._selector_to_name[identifier]
 
 
+def get_abi_entries_key(abi: AbiType, entry_type: str) -> str:
+    """
+    Returns a canonical representation of the entries of the given type in the ABI, which is
+    equal for ABIs with the same such entries (in the same order).
+    """
+    entries = [abi_entry for abi_entry in abi if abi_entry["type"] == entry_type]
+    return json.dumps(entries, sort_keys=True)
+
+
+@functools.lru_cache()
+def _get_cached_struct_manager(entries_key: str) -> StructManager:
+    return StructManager(abi=json.loads(entries_key))
+
+
+@functools.lru_cache()
+def _get_cached_event_manager(entries_key: str) -> EventManager:
+    return EventManager(abi=json.loads(entries_key))
+
+
 def parse_arguments(arguments_abi: List) -> Tuple[List[str], List[CairoType]]:
     """
     Given the input or output field of a StarkNet contract function ABI,
@@ -152,19 +209,6 @@ def parse_arguments(arguments_abi: List) -> Tuple[List[str], List[CairoType]]:
     return arg_names, arg_types
 
 
-def flatten(name: str, value: Union[Any, Iterable], max_depth: int = 30) -> List[Any]:
-    # Use max_depth to avoid, for example, a list that points to itself.
-    assert max_depth > 0, f"Exceeded maximun depth while parsing argument {name}."
-    if not isinstance(value, Iterable):
-        return [value]
-
-    res = []
-    for elm in value:
-        res.extend(flatten(name=name, value=elm, max_depth=max_depth - 1))
-
-    return res
-
-
 def get_abi(contract_class: ContractClass) -> AbiType:
     assert contract_class.abi is not None, "Missing ABI."
     return contract_class.abi
@@ -1,11 +1,48 @@
-from typing import List, Sequence, Union
+from typing import List, Sequence, Union, cast
 
 from starkware.cairo.lang.cairo_constants import DEFAULT_PRIME as PRIME
 
+# The range of values that may be cast to a felt.
+FELT_LOWER_BOUND = -(PRIME // 2)
+FELT_UPPER_BOUND = PRIME
+# The minimal number of values for which cast_to_felts() first checks whether all of them are
+# felts already; for fewer values, casting each value separately is faster.
+CAST_TO_FELTS_FAST_PATH_MIN_LENGTH = 32
+
+
+def cast_to_felt(value: Union[str, int]) -> int:
+    """
+    Casts the given value (an integer or a decimal/hexadecimal string) to a felt.
+    """
+    if isinstance(value, int):
+        value_int = value
+    else:
+        try:
+            value_int = int(value, 16) if value.startswith("0x") else int(value)
+        except ValueError:
+            raise ValueError(
+                f"Invalid input value: '{value}'. Expected a decimal or hexadecimal integer."
+            )
+
+    if not FELT_LOWER_BOUND <= value_int < FELT_UPPER_BOUND:
+        raise ValueError(
+            f"Input value '{value}' is out of bounds. "
+            f"Expected a value in the range [{FELT_LOWER_BOUND}, {FELT_UPPER_BOUND})."
+        )
+
+    return value_int % PRIME
+
 
 def cast_to_felts(values: Sequence[Union[str, int]]) -> List[int]:
-    lower_bound = -(PRIME // 2)
-    upper_bound = PRIME
+    # Fast path: when all the values are already felts (typically, the vast majority of the
+    # cases), verify this using builtins that pass over the values in C, instead of casting each
+    # value separately.
+    if len(values) >= CAST_TO_FELTS_FAST_PATH_MIN_LENGTH and set(map(type, values)) == {int}:
+        int_values = cast(Sequence[int], values)
+        if 0 <= min(int_values) and max(int_values) < PRIME:
+            return list(int_values)
+
+    # The body of cast_to_felt() is inlined, to avoid a function call per value.
     result = []
     for value in values:
         if isinstance(value, int):
@@ -18,10 +55,10 @@ def cast_to_felts(values: Sequence[Union[str, int]]) -> List[int]:
                     f"Invalid input value: '{value}'. Expected a decimal or hexadecimal integer."
                 )
 
-        if not lower_bound <= value_int < upper_bound:
+        if not FELT_LOWER_BOUND <= value_int < FELT_UPPER_BOUND:
             raise ValueError(
                 f"Input value '{value}' is out of bounds. "
-                f"Expected a value in the range [{lower_bound}, {upper_bound})."
+                f"Expected a value in the range [{FELT_LOWER_BOUND}, {FELT_UPPER_BOUND})."
             )
 
         result.append(value_int % PRIME)
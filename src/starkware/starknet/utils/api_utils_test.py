@@ -0,0 +1,30 @@
+import re
+
+import pytest
+
+from starkware.cairo.lang.cairo_constants import DEFAULT_PRIME as PRIME
+from starkware.starknet.utils.api_utils import CAST_TO_FELTS_FAST_PATH_MIN_LENGTH, cast_to_felts
+
+
+@pytest.mark.parametrize("n_padding_values", [0, CAST_TO_FELTS_FAST_PATH_MIN_LENGTH])
+def test_cast_to_felts(n_padding_values: int):
+    # Run with and without enough values for the fast path.
+    padding = [1] * n_padding_values
+
+    # Felts.
+    assert cast_to_felts(values=[0, 5, PRIME - 1] + padding) == [0, 5, PRIME - 1] + padding
+
+    # Values that are not felts (although they may be equal to ones).
+    values = [True, False, -1, -(PRIME // 2), "0x10", "17", "-3"]
+    expected = [1, 0, PRIME - 1, PRIME - PRIME // 2, 16, 17, PRIME - 3]
+    result = cast_to_felts(values=values + padding)
+    assert result == expected + padding
+    assert all(type(value) is int for value in result)
+
+    # Out of bounds values.
+    for value in [PRIME, -(PRIME // 2) - 1, hex(PRIME)]:
+        with pytest.raises(ValueError, match=re.escape(f"Input value '{value}' is out of bounds.")):
+            cast_to_felts(values=[value] + padding)
+
+    with pytest.raises(ValueError, match=re.escape("Invalid input value: '0xg'.")):
+        cast_to_felts(values=["0xg"] + padding)